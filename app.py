@@ -5,6 +5,8 @@ import streamlit as st
 import os
 import tempfile
 import time
+import uuid
+import hashlib
 from datetime import datetime
 from dotenv import load_dotenv
 from PIL import Image
@@ -16,7 +18,18 @@ import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 
-from rag_utils import load_pdf, create_vectorstore, get_pdf_preview
+from rag_utils import (
+    load_pdf,
+    create_vectorstore,
+    get_pdf_preview,
+    save_session_snapshot,
+    load_session_snapshot,
+    list_session_snapshots,
+    delete_session_snapshot,
+    prune_session_snapshots,
+    document_set_id,
+    pending_upload,
+)
 
 # ========================================
 # 🎨 CONFIGURATION & STYLING
@@ -231,7 +244,11 @@ def init_session_state():
         'query_count': 0,
         'processing_time': 0,
         'file_analytics': {},
-        'user_satisfaction': None
+        'user_satisfaction': None,
+        'session_id': None,
+        'document_set': None,
+        'handled_upload': None,
+        'owned_sessions': []
     }
     
     for key, value in defaults.items():
@@ -240,6 +257,96 @@ def init_session_state():
 
 init_session_state()
 
+# ========================================
+# 💾 SESSION SNAPSHOTS
+# ========================================
+
+# Plain session state persisted alongside the FAISS index (chains are rebuilt, never pickled)
+SNAPSHOT_KEYS = [
+    'chat_history', 'processed_files', 'total_chunks', 'session_start',
+    'query_count', 'processing_time', 'file_analytics', 'user_satisfaction',
+    'document_set'
+]
+
+def build_rag_chain(retriever, memory):
+    """Create the conversational RAG chain around a retriever and memory"""
+    llm = ChatGoogleGenerativeAI(
+        model="gemini-1.5-flash",
+        temperature=st.session_state.get('temperature', 0.2),
+        google_api_key=GOOGLE_API_KEY
+    )
+    return ConversationalRetrievalChain.from_llm(
+        llm=llm,
+        retriever=retriever,
+        memory=memory
+    )
+
+def save_snapshot(vectorstore=None):
+    """Write the current session to disk so it survives refreshes and restarts"""
+    if not st.session_state.session_id:
+        return
+    state = {key: st.session_state[key] for key in SNAPSHOT_KEYS}
+    state['session_start'] = state['session_start'].isoformat()
+    state['file_analytics'] = {
+        name: {**data, 'processed_at': data['processed_at'].isoformat()}
+        for name, data in state['file_analytics'].items()
+    }
+    memory = st.session_state.rag_chain.memory if st.session_state.rag_chain else None
+    saved = save_session_snapshot(st.session_state.session_id, state, vectorstore=vectorstore, memory=memory)
+    if saved is None and vectorstore is None and st.session_state.rag_chain:
+        # The index was pruned or deleted elsewhere; rewrite it from the live chain
+        save_session_snapshot(
+            st.session_state.session_id, state,
+            vectorstore=st.session_state.rag_chain.retriever.vectorstore, memory=memory
+        )
+
+def end_session():
+    """Drop the live chain and stop auto-restoring; snapshots stay on disk"""
+    for key in ['chat_history', 'processed_files', 'rag_chain', 'total_chunks', 'query_count']:
+        st.session_state[key] = [] if 'history' in key or 'files' in key else (None if 'chain' in key else 0)
+    st.session_state.session_id = None
+    st.session_state.document_set = None
+    st.session_state.handled_upload = None
+    st.query_params.clear()
+
+def restore_session(session_id):
+    """Rebuild a session from its snapshot without re-embedding any documents"""
+    snapshot = load_session_snapshot(session_id)
+    if snapshot is None:
+        return False
+    vectorstore, state, messages = snapshot
+
+    # Validate everything before touching session state so a bad snapshot changes nothing
+    try:
+        state = {key: state[key] for key in SNAPSHOT_KEYS}
+        state['session_start'] = datetime.fromisoformat(state['session_start'])
+        state['chat_history'] = [tuple(entry) for entry in state['chat_history']]
+        if any(len(entry) != 2 for entry in state['chat_history']):
+            return False
+        for data in state['file_analytics'].values():
+            data['processed_at'] = datetime.fromisoformat(data['processed_at'])
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return False
+    for key in SNAPSHOT_KEYS:
+        st.session_state[key] = state[key]
+
+    memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+    memory.chat_memory.add_messages(messages)
+    st.session_state.rag_chain = build_rag_chain(vectorstore.as_retriever(), memory)
+    st.session_state.session_id = session_id
+    # The restore takes priority over whatever the uploader currently holds
+    uploader_files = st.session_state.get('uploaded_files')
+    st.session_state.handled_upload = document_set_id(uploader_files) if uploader_files else None
+    if session_id not in st.session_state.owned_sessions:
+        st.session_state.owned_sessions.append(session_id)
+    return True
+
+# Restore after a browser refresh or pod restart using the session id in the URL
+if st.session_state.rag_chain is None and "session" in st.query_params:
+    if not restore_session(st.query_params["session"]):
+        del st.query_params["session"]
+        st.error("⚠️ Saved session could not be restored - it is missing, corrupt or incompatible")
+
 # ========================================
 # 🎯 MAIN HEADER
 # ========================================
@@ -292,6 +399,30 @@ with st.sidebar:
     st.success("🟢 Vector DB: Active")
     st.success("🟢 Embeddings: Ready")
     
+    # Saved sessions (only those created or restored in this browser session)
+    saved_sessions = [
+        session_id for session_id in list_session_snapshots()
+        if session_id in st.session_state.owned_sessions
+    ]
+    if saved_sessions:
+        st.markdown("### 💾 Saved Sessions")
+        selected_session = st.selectbox("Session", saved_sessions, label_visibility="collapsed")
+        restore_col, delete_col = st.columns(2)
+        with restore_col:
+            if st.button("♻️ Restore"):
+                if restore_session(selected_session):
+                    st.query_params["session"] = selected_session
+                    st.rerun()
+                else:
+                    st.error("Snapshot is missing, corrupt or incompatible")
+        with delete_col:
+            if st.button("🗑️ Delete"):
+                delete_session_snapshot(selected_session)
+                st.session_state.owned_sessions.remove(selected_session)
+                if selected_session == st.session_state.session_id:
+                    end_session()
+                st.rerun()
+    
     # File management
     if st.session_state.processed_files:
         st.markdown("### 📁 Processed Files")
@@ -300,7 +431,7 @@ with st.sidebar:
     
     # Settings
     st.markdown("### ⚙️ AI Settings")
-    temperature = st.slider("🌡️ Creativity", 0.0, 1.0, 0.2, 0.1)
+    temperature = st.slider("🌡️ Creativity", 0.0, 1.0, 0.2, 0.1, key="temperature")
     max_tokens = st.slider("📝 Max Response", 100, 2000, 1000, 100)
 
 # ========================================
@@ -324,11 +455,22 @@ uploaded_files = st.file_uploader(
     "Choose PDF files", 
     type=["pdf"], 
     accept_multiple_files=True,
-    help="Upload one or more PDF documents for AI analysis"
+    help="Upload one or more PDF documents for AI analysis",
+    key="uploaded_files"
 )
 
-# Document processing with enhanced UX
-if uploaded_files:
+# Document processing with enhanced UX (skipped when the uploader contents were already handled)
+upload_id = pending_upload(uploaded_files, st.session_state.handled_upload)
+if upload_id:
+    # A new document set starts a new session; the previous one stays in its own snapshot
+    st.session_state.session_id = None
+    st.session_state.session_start = datetime.now()
+    st.session_state.chat_history = []
+    st.session_state.processed_files = []
+    st.session_state.file_analytics = {}
+    st.session_state.query_count = 0
+    st.session_state.user_satisfaction = None
+
     with st.container():
         st.markdown("## 🔄 Processing Documents...")
         
@@ -371,7 +513,8 @@ if uploaded_files:
                 st.session_state.file_analytics[file.name] = {
                     'chunks': len(chunks),
                     'processed_at': datetime.now(),
-                    'size': file.size
+                    'size': file.size,
+                    'sha256': hashlib.sha256(file.getvalue()).hexdigest()
                 }
                 
                 # Cleanup
@@ -386,25 +529,24 @@ if uploaded_files:
             vectorstore = create_vectorstore(all_chunks)
             retriever = vectorstore.as_retriever()
             
-            # Initialize memory and LLM
+            # Initialize memory
     memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
 
-    llm = ChatGoogleGenerativeAI(
-                model="gemini-1.5-flash",
-                temperature=temperature,
-                google_api_key=GOOGLE_API_KEY
-            )
-
-            # Create RAG chain
-    st.session_state.rag_chain = ConversationalRetrievalChain.from_llm(
-        llm=llm,
-        retriever=retriever,
-        memory=memory
-    )
+    # Create RAG chain
+    st.session_state.rag_chain = build_rag_chain(retriever, memory)
 
        # Update metrics
     st.session_state.total_chunks = len(all_chunks)
     st.session_state.processing_time = time.time() - processing_start
+    st.session_state.document_set = upload_id
+    st.session_state.handled_upload = upload_id
+
+    # Snapshot the new index so this session can be restored without re-embedding
+    st.session_state.session_id = uuid.uuid4().hex
+    st.session_state.owned_sessions.append(st.session_state.session_id)
+    st.query_params["session"] = st.session_state.session_id
+    save_snapshot(vectorstore)
+    prune_session_snapshots(keep=(st.session_state.session_id,))
             
             # Success message
     progress_bar.progress(1.0)
@@ -438,6 +580,7 @@ if st.session_state.rag_chain:
                 result = st.session_state.rag_chain.invoke({"question": question.split(" ", 1)[1]})
                 st.session_state.chat_history.append(("You", question))
                 st.session_state.chat_history.append(("ChatSmart AI", result["answer"]))
+                save_snapshot()
 
     # Main chat input
     user_input = st.chat_input("💭 Ask anything about your documents...")
@@ -452,6 +595,7 @@ if st.session_state.rag_chain:
             
             st.session_state.chat_history.append(("You", user_input))
             st.session_state.chat_history.append(("ChatSmart AI", result["answer"]))
+            save_snapshot()
 
 # Chat history with enhanced UI
 if st.session_state.chat_history:
@@ -475,10 +619,12 @@ if st.session_state.chat_history:
                 with col1:
                     if st.button("👍", key=f"like_{i}"):
                         st.session_state.user_satisfaction = "positive"
+                        save_snapshot()
                         st.success("Thanks for your feedback!")
                 with col2:
                     if st.button("👎", key=f"dislike_{i}"):
                         st.session_state.user_satisfaction = "negative"
+                        save_snapshot()
                         st.info("We'll work on improving!")
 
 else:
@@ -554,8 +700,8 @@ if st.session_state.rag_chain:
     
     with col3:
         if st.button("🔄 Clear Session"):
-            for key in ['chat_history', 'processed_files', 'rag_chain', 'total_chunks', 'query_count']:
-                st.session_state[key] = [] if 'history' in key or 'files' in key else (None if 'chain' in key else 0)
+            # Keep the snapshot on disk (restorable from the sidebar) but stop auto-restoring it
+            end_session()
             st.success("🧹 Session cleared!")
             st.rerun()
     
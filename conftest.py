@@ -0,0 +1 @@
+# Lets plain `pytest` import the top-level modules (rag_utils) from tests/.
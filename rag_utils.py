@@ -1,6 +1,17 @@
 import os
+import re
+import json
+import hashlib
+import time
+import shutil
 import tempfile
+from functools import lru_cache
+import faiss
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import messages_from_dict, messages_to_dict
 from langchain_community.document_loaders import PyMuPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -11,6 +22,19 @@ from pdf2image import convert_from_path
 # Load Google API Key
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Session snapshots live here, one directory per session id
+SNAPSHOT_DIR = os.getenv("CHATSMART_SNAPSHOT_DIR", ".chatsmart_sessions")
+SNAPSHOT_VERSION = 1
+# Retention: oldest snapshots beyond either limit are deleted when a new one is created
+SNAPSHOT_MAX_COUNT = int(os.getenv("CHATSMART_SNAPSHOT_MAX_COUNT", "50"))
+SNAPSHOT_MAX_AGE_DAYS = float(os.getenv("CHATSMART_SNAPSHOT_MAX_AGE_DAYS", "30"))
+
+# Session ids are uuid4().hex; anything else could escape SNAPSHOT_DIR
+SESSION_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+SNAPSHOT_FILES = ("index.faiss", "docstore.json", "session.json")
+
 def load_pdf(file_input):
     """Load and split PDF into text chunks using PyMuPDF and LangChain splitters."""
     # Check if input is a file path (string) or file object
@@ -41,12 +65,23 @@ def load_pdf(file_input):
         if cleanup_needed and os.path.exists(pdf_path):
             os.unlink(pdf_path)
 
+@lru_cache(maxsize=1)
+def get_embeddings():
+    """Load the HuggingFace embedding model once per process."""
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+
+class LazyEmbeddings(Embeddings):
+    """Defer loading the embedding model until the first query needs it."""
+
+    def embed_documents(self, texts):
+        return get_embeddings().embed_documents(texts)
+
+    def embed_query(self, text):
+        return get_embeddings().embed_query(text)
+
 def create_vectorstore(chunks):
     """Create FAISS vectorstore from document chunks using HuggingFace embeddings."""
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
-    )
-    vectordb = FAISS.from_documents(chunks, embeddings)
+    vectordb = FAISS.from_documents(chunks, get_embeddings())
     return vectordb
 
 def load_and_embed(file_obj):
@@ -73,4 +108,209 @@ def get_gemini_response(vectorstore, query):
 def get_pdf_preview(pdf_path):
     """Convert first page of PDF to image for thumbnail preview."""
     images = convert_from_path(pdf_path, first_page=1, last_page=1)
-    return images[0] if images else None
\ No newline at end of file
+    return images[0] if images else None
+
+def _session_dir(session_id, root):
+    """Return the snapshot directory for a session id, or None if the id is malformed."""
+    if not isinstance(session_id, str) or not SESSION_ID_PATTERN.fullmatch(session_id):
+        return None
+    return os.path.join(root, session_id)
+
+def _replace_atomically(path, write):
+    """Call ``write(tmp_path)`` on a unique temp file, then move it over ``path``.
+
+    Each writer gets its own temp file, so two tabs saving the same session
+    never clobber each other's half-written data.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+def _write_json(path, data):
+    """Write JSON atomically so a crash never leaves a half-written snapshot."""
+    def write(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, default=str)
+    _replace_atomically(path, write)
+
+def document_set_id(files):
+    """Fingerprint a set of uploaded files by the content hashes of its files."""
+    digests = sorted(hashlib.sha256(file.getvalue()).hexdigest() for file in files)
+    return hashlib.sha256("".join(digests).encode()).hexdigest()
+
+def pending_upload(files, handled_upload):
+    """Return the document set id of ``files`` if it still needs ingesting, else None.
+
+    ``handled_upload`` is the id of the uploader contents that were last
+    ingested or deliberately superseded (e.g. by restoring a snapshot).
+    """
+    if not files:
+        return None
+    upload_id = document_set_id(files)
+    return None if upload_id == handled_upload else upload_id
+
+class ReadOnlyVectorStoreError(RuntimeError):
+    """Raised when writing to a vectorstore restored from a session snapshot."""
+
+class ReadOnlyFAISS(FAISS):
+    """FAISS store over a memory-mapped index that refuses writes.
+
+    Adding to a memory-mapped faiss index aborts the whole process with a
+    C++ assertion, so writes are rejected here with a Python exception.
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise ReadOnlyVectorStoreError(
+            "Restored session vectorstores are memory-mapped and cannot be modified; "
+            "re-ingest the documents to build a writable index"
+        )
+
+    add_texts = add_embeddings = add_documents = merge_from = delete = _read_only
+
+def list_session_snapshots(root=SNAPSHOT_DIR):
+    """Return loadable session ids, most recently updated first."""
+    if not os.path.isdir(root):
+        return []
+    manifests = []
+    for name in os.listdir(root):
+        session_dir = _session_dir(name, root)
+        if session_dir is None:
+            continue
+        # Skip snapshots that are incomplete or deleted concurrently by a prune
+        try:
+            if not all(os.path.exists(os.path.join(session_dir, f)) for f in SNAPSHOT_FILES):
+                continue
+            manifests.append((os.path.getmtime(os.path.join(session_dir, "session.json")), name))
+        except OSError:
+            continue
+    return [name for _, name in sorted(manifests, reverse=True)]
+
+def delete_session_snapshot(session_id, root=SNAPSHOT_DIR):
+    """Remove a saved session from disk. Returns True if anything was deleted."""
+    session_dir = _session_dir(session_id, root)
+    if session_dir is None or not os.path.isdir(session_dir):
+        return False
+    shutil.rmtree(session_dir, ignore_errors=True)
+    return True
+
+def prune_session_snapshots(root=SNAPSHOT_DIR, max_count=SNAPSHOT_MAX_COUNT,
+                            max_age_days=SNAPSHOT_MAX_AGE_DAYS, keep=()):
+    """Delete snapshots older than ``max_age_days`` or beyond the newest ``max_count``.
+
+    Session ids in ``keep`` (e.g. the one currently saving) are never deleted.
+    """
+    cutoff = time.time() - max_age_days * 86400
+    removed = []
+    for position, session_id in enumerate(list_session_snapshots(root)):
+        if session_id in keep:
+            continue
+        try:
+            expired = os.path.getmtime(os.path.join(root, session_id, "session.json")) < cutoff
+        except OSError:
+            continue
+        if position >= max_count or expired:
+            delete_session_snapshot(session_id, root)
+            removed.append(session_id)
+    return removed
+
+def save_session_snapshot(session_id, state, vectorstore=None, memory=None, root=SNAPSHOT_DIR):
+    """Persist a session to disk without pickling any chain or model.
+
+    Layout of ``<root>/<session_id>/``:
+      index.faiss  - raw FAISS index (float32 vectors, native binary format)
+      docstore.json - chunk texts/metadata and the index -> docstore id mapping
+      session.json  - document set reference, memory messages and metrics
+
+    The index and docstore are only rewritten when ``vectorstore`` is given,
+    so saving after every query just updates the small session.json.
+    Returns the snapshot directory, or ``None`` if ``session_id`` is malformed
+    or no ``vectorstore`` was given and the saved index is gone (e.g. pruned).
+    """
+    session_dir = _session_dir(session_id, root)
+    if session_dir is None:
+        return None
+    if vectorstore is None and not os.path.exists(os.path.join(session_dir, "index.faiss")):
+        return None
+    os.makedirs(session_dir, exist_ok=True)
+
+    if vectorstore is not None:
+        _replace_atomically(
+            os.path.join(session_dir, "index.faiss"),
+            lambda tmp_path: faiss.write_index(vectorstore.index, tmp_path),
+        )
+
+        docs = {
+            doc_id: {"page_content": doc.page_content, "metadata": doc.metadata}
+            for doc_id, doc in vectorstore.docstore._dict.items()
+        }
+        _write_json(os.path.join(session_dir, "docstore.json"), {
+            "index_to_docstore_id": [
+                vectorstore.index_to_docstore_id[i]
+                for i in range(len(vectorstore.index_to_docstore_id))
+            ],
+            "docs": docs,
+        })
+
+    messages = messages_to_dict(memory.chat_memory.messages) if memory is not None else []
+    _write_json(os.path.join(session_dir, "session.json"), {
+        "version": SNAPSHOT_VERSION,
+        "embedding_model": EMBEDDING_MODEL,
+        "state": state,
+        "memory": messages,
+    })
+    return session_dir
+
+def load_session_snapshot(session_id, root=SNAPSHOT_DIR, embeddings=None):
+    """Restore a saved session as ``(vectorstore, state, messages)``.
+
+    The FAISS index is memory-mapped read-only instead of being re-embedded
+    and the embedding model is only loaded on the first query, so restoring
+    takes well under a second regardless of document size. The returned
+    store is a ``ReadOnlyFAISS``: it can be searched but not added to.
+    Returns ``None`` if the id is malformed, or the snapshot is missing,
+    corrupt or was written by an incompatible version.
+    """
+    session_dir = _session_dir(session_id, root)
+    if session_dir is None:
+        return None
+    manifest_path = os.path.join(session_dir, "session.json")
+    index_path = os.path.join(session_dir, "index.faiss")
+    docstore_path = os.path.join(session_dir, "docstore.json")
+    if not all(os.path.exists(p) for p in (manifest_path, index_path, docstore_path)):
+        return None
+
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if (manifest.get("version") != SNAPSHOT_VERSION
+                or manifest.get("embedding_model") != EMBEDDING_MODEL):
+            return None
+
+        # IO_FLAG_MMAP_IFC maps flat indexes too; older faiss only maps IVF lists
+        mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+        index = faiss.read_index(index_path, mmap_flag | faiss.IO_FLAG_READ_ONLY)
+
+        with open(docstore_path, encoding="utf-8") as f:
+            stored = json.load(f)
+        docstore = InMemoryDocstore({
+            doc_id: Document(id=doc_id, page_content=doc["page_content"], metadata=doc["metadata"])
+            for doc_id, doc in stored["docs"].items()
+        })
+        index_to_docstore_id = dict(enumerate(stored["index_to_docstore_id"]))
+        messages = messages_from_dict(manifest["memory"])
+        state = manifest["state"]
+    except (OSError, RuntimeError, ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+    vectorstore = ReadOnlyFAISS(
+        embedding_function=embeddings or LazyEmbeddings(),
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id,
+    )
+    return vectorstore, state, messages
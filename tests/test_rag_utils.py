@@ -0,0 +1,188 @@
+import io
+import json
+import os
+import uuid
+
+import pytest
+from langchain.memory import ConversationBufferMemory
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+import rag_utils
+from rag_utils import (
+    ReadOnlyVectorStoreError,
+    delete_session_snapshot,
+    document_set_id,
+    list_session_snapshots,
+    load_session_snapshot,
+    pending_upload,
+    prune_session_snapshots,
+    save_session_snapshot,
+)
+
+
+class FakeEmbeddings(Embeddings):
+    """Bag-of-letters vectors so tests never download the real model."""
+
+    def _embed(self, text):
+        vector = [0.0] * 26
+        for char in text.lower():
+            if "a" <= char <= "z":
+                vector[ord(char) - ord("a")] += 1.0
+        return vector
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+@pytest.fixture
+def snapshot():
+    embeddings = FakeEmbeddings()
+    docs = [
+        Document(page_content="apples and oranges", metadata={"page": 0}),
+        Document(page_content="zebra xylophone", metadata={"page": 1}),
+    ]
+    vectorstore = FAISS.from_documents(docs, embeddings)
+    memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+    memory.chat_memory.add_user_message("What fruit?")
+    memory.chat_memory.add_ai_message("Apples and oranges.")
+    state = {"query_count": 1, "processed_files": ["fruit.pdf"]}
+    return embeddings, vectorstore, memory, state
+
+
+def test_snapshot_round_trip(tmp_path, snapshot):
+    embeddings, vectorstore, memory, state = snapshot
+    session_id = uuid.uuid4().hex
+    save_session_snapshot(session_id, state, vectorstore=vectorstore, memory=memory, root=str(tmp_path))
+
+    restored, restored_state, messages = load_session_snapshot(
+        session_id, root=str(tmp_path), embeddings=embeddings
+    )
+
+    assert restored_state == state
+    assert restored.index_to_docstore_id == vectorstore.index_to_docstore_id
+    assert restored.docstore._dict == vectorstore.docstore._dict
+    assert messages == memory.chat_memory.messages
+    for query in ("orange", "zebra"):
+        expected = vectorstore.similarity_search(query, k=1)
+        assert restored.similarity_search(query, k=1) == expected
+
+
+def test_restored_vectorstore_is_read_only(tmp_path, snapshot):
+    embeddings, vectorstore, memory, state = snapshot
+    session_id = uuid.uuid4().hex
+    save_session_snapshot(session_id, state, vectorstore=vectorstore, memory=memory, root=str(tmp_path))
+    restored, _, _ = load_session_snapshot(session_id, root=str(tmp_path), embeddings=embeddings)
+
+    with pytest.raises(ReadOnlyVectorStoreError):
+        restored.add_texts(["more text"])
+    with pytest.raises(ReadOnlyVectorStoreError):
+        restored.add_documents([Document(page_content="more text")])
+
+
+@pytest.mark.parametrize("field, value", [
+    ("version", rag_utils.SNAPSHOT_VERSION + 1),
+    ("embedding_model", "some-other-model"),
+])
+def test_incompatible_snapshot_returns_none(tmp_path, snapshot, field, value):
+    embeddings, vectorstore, memory, state = snapshot
+    session_id = uuid.uuid4().hex
+    session_dir = save_session_snapshot(session_id, state, vectorstore=vectorstore, root=str(tmp_path))
+
+    manifest_path = os.path.join(session_dir, "session.json")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    manifest[field] = value
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+
+    assert load_session_snapshot(session_id, root=str(tmp_path), embeddings=embeddings) is None
+
+
+def test_corrupt_snapshot_returns_none(tmp_path, snapshot):
+    embeddings, vectorstore, memory, state = snapshot
+    session_id = uuid.uuid4().hex
+    session_dir = save_session_snapshot(session_id, state, vectorstore=vectorstore, root=str(tmp_path))
+
+    with open(os.path.join(session_dir, "index.faiss"), "wb") as f:
+        f.write(b"not a faiss index")
+
+    assert load_session_snapshot(session_id, root=str(tmp_path), embeddings=embeddings) is None
+
+
+@pytest.mark.parametrize("session_id", ["../..", "/tmp", "ABCDEF" * 6, "", None])
+def test_malformed_session_id_is_rejected(tmp_path, snapshot, session_id):
+    embeddings, vectorstore, memory, state = snapshot
+    assert save_session_snapshot(session_id, state, vectorstore=vectorstore, root=str(tmp_path)) is None
+    assert load_session_snapshot(session_id, root=str(tmp_path), embeddings=embeddings) is None
+    assert not delete_session_snapshot(session_id, root=str(tmp_path))
+    assert os.listdir(tmp_path) == []
+
+
+def test_delete_and_prune(tmp_path, snapshot):
+    _, vectorstore, _, state = snapshot
+    session_ids = [uuid.uuid4().hex for _ in range(3)]
+    for age, session_id in enumerate(session_ids):
+        session_dir = save_session_snapshot(session_id, state, vectorstore=vectorstore, root=str(tmp_path))
+        mtime = os.path.getmtime(os.path.join(session_dir, "session.json")) - age * 60
+        os.utime(os.path.join(session_dir, "session.json"), (mtime, mtime))
+
+    assert delete_session_snapshot(session_ids[1], root=str(tmp_path))
+    assert list_session_snapshots(root=str(tmp_path)) == [session_ids[0], session_ids[2]]
+
+    assert prune_session_snapshots(root=str(tmp_path), max_count=1) == [session_ids[2]]
+    assert list_session_snapshots(root=str(tmp_path)) == [session_ids[0]]
+
+
+def test_prune_never_deletes_kept_session(tmp_path, snapshot):
+    _, vectorstore, _, state = snapshot
+    session_ids = [uuid.uuid4().hex for _ in range(3)]
+    for session_id in session_ids:
+        save_session_snapshot(session_id, state, vectorstore=vectorstore, root=str(tmp_path))
+
+    prune_session_snapshots(root=str(tmp_path), max_count=0, keep=(session_ids[1],))
+    assert list_session_snapshots(root=str(tmp_path)) == [session_ids[1]]
+
+
+def test_save_without_index_skips_pruned_session(tmp_path, snapshot):
+    _, vectorstore, memory, state = snapshot
+    session_id = uuid.uuid4().hex
+    save_session_snapshot(session_id, state, vectorstore=vectorstore, root=str(tmp_path))
+    delete_session_snapshot(session_id, root=str(tmp_path))
+
+    assert save_session_snapshot(session_id, state, memory=memory, root=str(tmp_path)) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_list_skips_incomplete_and_vanishing_snapshots(tmp_path, snapshot, monkeypatch):
+    _, vectorstore, _, state = snapshot
+    complete, incomplete = uuid.uuid4().hex, uuid.uuid4().hex
+    save_session_snapshot(complete, state, vectorstore=vectorstore, root=str(tmp_path))
+    save_session_snapshot(incomplete, state, vectorstore=vectorstore, root=str(tmp_path))
+    os.unlink(os.path.join(tmp_path, incomplete, "index.faiss"))
+    assert list_session_snapshots(root=str(tmp_path)) == [complete]
+
+    def vanished(path):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os.path, "getmtime", vanished)
+    assert list_session_snapshots(root=str(tmp_path)) == []
+
+
+class FakeUpload(io.BytesIO):
+    """Stand-in for Streamlit's UploadedFile."""
+
+
+def test_restore_takes_priority_over_uploader_contents():
+    uploader = [FakeUpload(b"%PDF current upload")]
+    # Restoring records the uploader's current contents as handled...
+    handled_upload = document_set_id(uploader)
+    assert pending_upload(uploader, handled_upload) is None
+    # ...so only a change to the uploader triggers ingestion again
+    changed = uploader + [FakeUpload(b"%PDF another file")]
+    assert pending_upload(changed, handled_upload) == document_set_id(changed)
+    assert pending_upload([], handled_upload) is None